@@ -1,8 +1,12 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Any, Dict
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional, Any, Dict, Iterator, Literal
 import os
+import csv
+import io
+import itertools
 from dotenv import load_dotenv
 import xmlrpc.client
 from openai import OpenAI
@@ -47,6 +51,11 @@ client = OpenAI(
 # Claude Haiku 4.5 model configuration
 CLAUDE_MODEL = "anthropic/claude-sonnet-4.5"
 
+# Maximum characters of record data sent to the LLM in a single summarization prompt
+SUMMARY_CHUNK_CHARS = int(os.getenv("SUMMARY_CHUNK_CHARS", "60000"))
+if SUMMARY_CHUNK_CHARS < 1000:
+    raise ValueError("SUMMARY_CHUNK_CHARS must be at least 1000 characters")
+
 class ChatMessage(BaseModel):
     message: str
     context: Optional[dict] = None
@@ -58,6 +67,15 @@ class DatabaseOperation(BaseModel):
     args: List[Any]
     kwargs: Dict[str, Any] = {}
 
+class ReportRequest(BaseModel):
+    model: str
+    domain: List[Any] = []
+    fields: List[str] = []
+    format: Literal["ndjson", "csv"] = "ndjson"
+    batch_size: int = Field(default=500, ge=1, le=5000)
+    summarize: bool = False
+    question: Optional[str] = None
+
 def connect_to_odoo():
     """Establish connection to Odoo instance"""
     try:
@@ -411,6 +429,153 @@ def execute_database_operation(operation: DatabaseOperation):
         logger.error(f"Error args: {e.args}")
         raise
 
+def iter_report_batches(uid, models, report: ReportRequest) -> Iterator[List[dict]]:
+    """Page through search_read with an id cursor, yielding one batch of records at a time"""
+    last_id = 0
+    while True:
+        kwargs = {'limit': report.batch_size, 'order': 'id asc'}
+        if report.fields:
+            kwargs['fields'] = report.fields
+        batch = models.execute_kw(ODOO_DB, uid, ODOO_PASSWORD,
+            report.model, 'search_read',
+            [report.domain + [['id', '>', last_id]]],
+            kwargs)
+        if not batch:
+            return
+        yield batch
+        if len(batch) < report.batch_size:
+            return
+        last_id = batch[-1]['id']
+
+def _csv_value(value):
+    """Flatten an Odoo field value into a single CSV cell"""
+    if value is False or value is None:
+        return ""
+    # many2one fields are returned as [id, display_name]
+    if isinstance(value, list) and len(value) == 2 and isinstance(value[0], int) and isinstance(value[1], str):
+        return value[1]
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=str)
+    return value
+
+def stream_ndjson(batches: Iterator[List[dict]]) -> Iterator[str]:
+    """Serialize record batches as newline-delimited JSON"""
+    for batch in batches:
+        yield "".join(json.dumps(record, default=str) + "\n" for record in batch)
+
+def stream_csv(batches: Iterator[List[dict]], fields: List[str]) -> Iterator[str]:
+    """Serialize record batches as CSV, writing the header up front when fields are known"""
+    header = list(fields) or None
+    if header:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(header)
+        yield buffer.getvalue()
+    for batch in batches:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if header is None:
+            # Without explicit fields Odoo returns every field, so take the header from the data
+            header = list(batch[0].keys())
+            writer.writerow(header)
+        for record in batch:
+            writer.writerow([_csv_value(record.get(name)) for name in header])
+        yield buffer.getvalue()
+
+def log_stream_errors(body: Iterator[str], model: str) -> Iterator[str]:
+    """Log errors raised after the response headers were sent, when the status can no longer change"""
+    try:
+        yield from body
+    except Exception as e:
+        logger.error(f"Error streaming {model} report, output is incomplete: {str(e)}")
+        logger.error(f"Error type: {type(e)}")
+        logger.error(f"Error args: {e.args}")
+        raise
+
+def iter_text_chunks(lines: Iterator[str], max_chars: int) -> Iterator[str]:
+    """Group lines into chunks of at most max_chars characters (a single oversized line is kept whole)"""
+    chunk = []
+    size = 0
+    for line in lines:
+        if chunk and size + len(line) > max_chars:
+            yield "".join(chunk)
+            chunk = []
+            size = 0
+        chunk.append(line)
+        size += len(line)
+    if chunk:
+        yield "".join(chunk)
+
+def truncate_text(text: str, max_chars: int) -> str:
+    """Cut text down to at most max_chars characters, marking where it was truncated"""
+    marker = " ...[truncated]"
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= len(marker):
+        return text[:max_chars]
+    return text[:max_chars - len(marker)] + marker
+
+def summarize_chunk(prompt: str, content: str, max_tokens: int = 2048) -> str:
+    """Run a single summarization call against Claude via Vercel AI Gateway"""
+    response = client.chat.completions.create(
+        model=CLAUDE_MODEL,
+        messages=[
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": content}
+        ],
+        max_tokens=max_tokens,
+        temperature=0.2
+    )
+    return response.choices[0].message.content
+
+def summarize_report(report: ReportRequest, batches: Iterator[List[dict]]) -> dict:
+    """Map-reduce summarization of a result set too large to fit in a single prompt"""
+    question = report.question or f"Summarize these {report.model} records."
+    map_prompt = f"""You are an AI assistant for an Odoo ERP system.
+        You are given one chunk of a larger set of {report.model} records, one JSON record per line.
+        Extract everything in this chunk that is relevant to the question below, including counts,
+        totals and notable records, so it can later be combined with the other chunks.
+        Question: {question}"""
+    reduce_prompt = f"""You are an AI assistant for an Odoo ERP system.
+        You are given partial summaries, each covering a different chunk of {report.model} records.
+        Combine them into a single answer to the question below. Add up counts and totals across
+        chunks rather than repeating them, and mention if the data looks incomplete.
+        Question: {question}"""
+
+    record_count = 0
+
+    def record_lines():
+        nonlocal record_count
+        for batch in batches:
+            record_count += len(batch)
+            for record in batch:
+                # A single oversized record is truncated so no chunk exceeds the budget
+                line = truncate_text(json.dumps(record, default=str), SUMMARY_CHUNK_CHARS - 1)
+                yield line + "\n"
+
+    # Map: summarize each chunk as it streams in, keeping only the partial summaries in memory
+    summaries = []
+    for index, chunk in enumerate(iter_text_chunks(record_lines(), SUMMARY_CHUNK_CHARS)):
+        logger.info(f"Summarizing report chunk {index + 1} ({len(chunk)} chars)")
+        summaries.append(summarize_chunk(map_prompt, chunk, max_tokens=1024))
+    chunk_count = len(summaries)
+
+    if not summaries:
+        return {"summary": "No records matched the requested domain.", "records": 0, "chunks": 0}
+
+    # Reduce: combine partial summaries until a single one remains. Each partial summary is
+    # capped at half the budget, so with SUMMARY_CHUNK_CHARS >= 1000 (checked at startup) every
+    # group holds at least two and the count always shrinks.
+    while len(summaries) > 1:
+        separated = []
+        for i, summary in enumerate(summaries):
+            heading = f"--- Partial summary {i + 1} ---\n"
+            body = truncate_text(summary, max(SUMMARY_CHUNK_CHARS // 2 - len(heading) - 1, 0))
+            separated.append(f"{heading}{body}\n")
+        groups = iter_text_chunks(iter(separated), SUMMARY_CHUNK_CHARS)
+        summaries = [summarize_chunk(reduce_prompt, group) for group in groups]
+
+    return {"summary": summaries[0], "records": record_count, "chunks": chunk_count}
+
 def process_with_llm(message: str, context: dict, conversation_history: List[dict] = None):
     """Process the message with Claude via Vercel AI Gateway and return a response"""
     try:
@@ -587,6 +752,39 @@ async def chat(message: ChatMessage):
         logger.error(f"Error args: {e.args}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/report")
+def report(report: ReportRequest):
+    """Stream every record matching a domain as NDJSON or CSV, or summarize them with the LLM"""
+    try:
+        logger.info(f"Received report request: {report.model} domain={report.domain} fields={report.fields}")
+        uid, models = connect_to_odoo()
+        batches = iter_report_batches(uid, models, report)
+
+        if report.summarize:
+            return summarize_report(report, batches)
+
+        # Fetch the first batch before streaming starts so a bad model, field, domain or
+        # access right is reported as an HTTP error instead of an empty 200 response
+        first_batch = next(batches, None)
+        batches = itertools.chain([first_batch], batches) if first_batch else iter(())
+
+        if report.format == "csv":
+            body, media_type, extension = stream_csv(batches, report.fields), "text/csv", "csv"
+        else:
+            body, media_type, extension = stream_ndjson(batches), "application/x-ndjson", "ndjson"
+
+        filename = f"{report.model.replace('.', '_')}.{extension}"
+        return StreamingResponse(
+            log_stream_errors(body, report.model),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+    except Exception as e:
+        logger.error(f"Error in report endpoint: {str(e)}")
+        logger.error(f"Error type: {type(e)}")
+        logger.error(f"Error args: {e.args}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file